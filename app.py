@@ -7,6 +7,8 @@ This is the main script for multisocial app
 # Import necessary system and utility modules
 import os
 import threading
+import collections
+import importlib.util
 
 
 # Third-party libraries (assumed pre-installed via requirements.txt)
@@ -14,21 +16,77 @@ import ffmpeg
 import opensmile
 import wx
 import librosa
+import numpy as np
+import soundfile as sf
 import torch
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, WhisperFeatureExtractor, pipeline
+
+# Optional: CTranslate2 Whisper backend (int8), falls back to the transformers pipeline
+try:
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    faster_whisper_available = True
+except ImportError:
+    faster_whisper_available = False
+
+# Optional: ONNX Runtime backend for the transformers pipeline on CPU-only machines
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+    onnxruntime_available = True
+except ImportError:
+    onnxruntime_available = False
 
 # Import the core pose processing class
 from pose import PoseProcessor
 
+# Audio loading and OpenSMILE feature extraction (light module, also imported by worker processes)
+from audio_features import AUDIO_SAMPLE_RATE, load_audio, extract_audio_features_file, extract_audio_features_files
+
 # Set up GPU environment specially for Mediapipe (specific for Saturn Cloud), if you use some other high performance computing platform check compatibility before usage
 os.environ["CUDA_VISIBLE_DEVICES"] = "0"  # Make sure the system uses the GPU
 
 
 ## All dependencies are expected to be installed ahead of time via requirements.txt
 
+
 # (Optional) Helper for Windows FFmpeg setup was removed to avoid runtime installs
 
 
+# Whisper backend: "faster-whisper", "transformers", or "auto" (faster-whisper when installed)
+WHISPER_BACKEND = os.environ.get("MULTISOCIAL_WHISPER_BACKEND", "auto")
+
+# The ONNX export of Whisper is saved here on first use so later runs load it instead of re-exporting
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "multisocial_toolbox", "onnx")
+
+# On GPUs with less memory than this, Whisper is placed by accelerate so weights that do not fit are offloaded to host memory
+WHISPER_OFFLOAD_VRAM_BYTES = 10 * 1024 ** 3
+
+
+def _audio_duration(filepath):
+    """Return the duration of an audio file in seconds, read from its header when possible.
+
+    Unreadable files get an infinite duration, so they sort last and fail when they are transcribed.
+    """
+    try:
+        return sf.info(filepath).duration
+    except RuntimeError:
+        pass  # Format not readable by soundfile, let librosa decode it
+    try:
+        return librosa.get_duration(path=filepath)
+    except Exception:
+        return float("inf")
+
+
+class _DeviceWhisperFeatureExtractor(WhisperFeatureExtractor):
+    """Whisper feature extractor that runs its STFT/mel filterbank on `device` instead of the CPU."""
+
+    device = "cpu"
+
+    def __call__(self, *args, **kwargs):
+        kwargs.setdefault("device", self.device)
+        return super().__call__(*args, **kwargs)
+
+
 class GradientPanel(wx.Panel):
     def __init__(self, parent):
         super(GradientPanel, self).__init__(parent)
@@ -144,6 +202,9 @@ class TooltipButton(wx.Button):
 
 
 class VideoToWavConverter(wx.Frame):
+    # Loaded Whisper backends shared by every instance, keyed by (model id, device, precision)
+    _whisper_cache = {}
+
     def __init__(self, *args, **kw):
         super(VideoToWavConverter, self).__init__(*args, **kw)
         
@@ -295,6 +356,12 @@ class VideoToWavConverter(wx.Frame):
         placeholder_middle.SetFont(placeholder_font)
         vbox.Add(placeholder_middle, flag=wx.ALIGN_CENTER|wx.ALL, border=12)
 
+        # Toggle for Parquet output (audio features option)
+        self.parquetCheckbox = wx.CheckBox(pnl, label="Save Audio Features as Parquet")
+        self.parquetCheckbox.SetFont(wx.Font(14, wx.FONTFAMILY_SWISS, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        self.parquetCheckbox.SetForegroundColour('#FFFFFF')
+        vbox.Add(self.parquetCheckbox, flag=wx.ALIGN_CENTER|wx.ALL, border=10)
+
         # Extract Audio Features Button with Placeholder
         hbox_extract_audio = wx.BoxSizer(wx.HORIZONTAL)
         #placeholder_audio = wx.StaticText(pnl, label="To extract audio features:")
@@ -342,6 +409,21 @@ class VideoToWavConverter(wx.Frame):
         vbox.Add(self.progress, proportion=1, flag=wx.EXPAND|wx.ALL, border=12)
         
         pnl.SetSizer(vbox)
+
+        # Output format for OpenSMILE features: "csv" or "parquet", set from the checkbox on each run
+        self.audio_features_format = "csv"
+
+        # Whisper is loaded lazily on the first transcription
+        self.whisper_backend = WHISPER_BACKEND
+        self.use_faster_whisper = False
+        self.whisper_model = None
+        self.whisper_pipe = None
+        self.vad = None
+
+        if torch.cuda.is_available():
+            # Allow TF32 matmuls and let cuDNN pick the fastest kernels for the ASR model
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.benchmark = True
         
         self.SetSize((400, 800))  # Adjusted the size to accommodate new elements
         self.SetTitle('MultiSOCIAL Toolbox')
@@ -490,18 +572,21 @@ class VideoToWavConverter(wx.Frame):
         pose_processor = PoseProcessor(self.extracted_pose_folder, status_callback=self.set_status_message)
         pose_processor.set_multi_person_mode(self.multiPersonCheckbox.GetValue())
 
-        for index, video_file in enumerate(video_files, start=1):
-            self.set_status_message(f"📸 Extracting pose from: {os.path.basename(video_file)}")
-            
-            # Create progress callback for this video
-            def make_progress_callback(video_index, total_videos):
-                def progress_callback(frame_progress):
-                    # Calculate overall progress: (video_index-1)/total_videos + frame_progress/total_videos
-                    overall_progress = int(((video_index - 1) / total_videos) * 100 + (frame_progress / total_videos))
-                    self.update_progress(overall_progress)
-                return progress_callback
-            
-            pose_processor.extract_pose_features(video_file, progress_callback=make_progress_callback(index, total_files))
+        try:
+            for index, video_file in enumerate(video_files, start=1):
+                self.set_status_message(f"📸 Extracting pose from: {os.path.basename(video_file)}")
+
+                # Create progress callback for this video
+                def make_progress_callback(video_index, total_videos):
+                    def progress_callback(frame_progress):
+                        # Calculate overall progress: (video_index-1)/total_videos + frame_progress/total_videos
+                        overall_progress = int(((video_index - 1) / total_videos) * 100 + (frame_progress / total_videos))
+                        self.update_progress(overall_progress)
+                    return progress_callback
+
+                pose_processor.extract_pose_features(video_file, progress_callback=make_progress_callback(index, total_files))
+        finally:
+            pose_processor.close()
 
         wx.CallAfter(wx.MessageBox, "Pose feature extraction completed!", "Success", wx.OK | wx.ICON_INFORMATION)
         self.update_progress(0)  # Reset progress bar
@@ -531,18 +616,21 @@ class VideoToWavConverter(wx.Frame):
     def embed_pose_batch(self, video_files, pose_processor):
         total_files = len(video_files)
 
-        for index, video_file in enumerate(video_files, start=1):
-            self.set_status_message(f"🕺 Embedding poses for: {os.path.basename(video_file)}")
-            
-            # Create progress callback for this video
-            def make_progress_callback(video_index, total_videos):
-                def progress_callback(frame_progress):
-                    # Calculate overall progress: (video_index-1)/total_videos + frame_progress/total_videos
-                    overall_progress = int(((video_index - 1) / total_videos) * 100 + (frame_progress / total_videos))
-                    self.update_progress(overall_progress)
-                return progress_callback
-            
-            pose_processor.embed_pose_video(video_file, progress_callback=make_progress_callback(index, total_files))
+        try:
+            for index, video_file in enumerate(video_files, start=1):
+                self.set_status_message(f"🕺 Embedding poses for: {os.path.basename(video_file)}")
+
+                # Create progress callback for this video
+                def make_progress_callback(video_index, total_videos):
+                    def progress_callback(frame_progress):
+                        # Calculate overall progress: (video_index-1)/total_videos + frame_progress/total_videos
+                        overall_progress = int(((video_index - 1) / total_videos) * 100 + (frame_progress / total_videos))
+                        self.update_progress(overall_progress)
+                    return progress_callback
+
+                pose_processor.embed_pose_video(video_file, progress_callback=make_progress_callback(index, total_files))
+        finally:
+            pose_processor.close()
 
         wx.CallAfter(wx.MessageBox, "Pose embedding completed!", "Success", wx.OK | wx.ICON_INFORMATION)
         self.update_progress(0)  # Reset progress bar
@@ -564,26 +652,31 @@ class VideoToWavConverter(wx.Frame):
             wx.MessageBox("No WAV files found in the selected folder.", "Error", wx.OK | wx.ICON_ERROR)
             return
 
+        self.audio_features_format = "parquet" if self.parquetCheckbox.GetValue() else "csv"
+
         thread = threading.Thread(target=self.extract_audio_features_batch, args=(audio_files,))
         thread.start()
 
     def extract_audio_features_batch(self, audio_files):
-        """Batch process all audio files to extract features."""
+        """Batch process all audio files to extract features, one worker process per CPU core."""
         total_files = len(audio_files)
-
-        for i, audio_file in enumerate(audio_files):
-            self.set_status_message(f"🎧 Extracting audio from: {os.path.basename(audio_file)}")
-            print(f"Extracting features from: {audio_file}")
-            
-            # Create progress callback for this audio file
-            def make_progress_callback(audio_index, total_audios):
-                def progress_callback(extraction_progress):
-                    # Calculate overall progress: (audio_index-1)/total_audios + extraction_progress/total_audios
-                    overall_progress = int(((audio_index - 1) / total_audios) * 100 + (extraction_progress / total_audios))
-                    self.update_progress(overall_progress)
-                return progress_callback
-            
-            self.extract_audio_features(audio_file, progress_callback=make_progress_callback(i + 1, total_files))
+        feature_set_name = opensmile.FeatureSet.ComParE_2016
+        feature_level_name = opensmile.FeatureLevel.LowLevelDescriptors
+
+        self.set_status_message(f"🎧 Extracting audio features from {total_files} file(s)")
+        self.update_progress(0)
+
+        # OpenSMILE is pure CPU work, so files are spread over worker processes
+        results = extract_audio_features_files(
+            audio_files, self.extracted_audio_folder, feature_set_name, feature_level_name, self.audio_features_format
+        )
+        for done, (audio_file, output_path, error) in enumerate(results, start=1):
+            if error is None:
+                self.set_status_message(f"🎧 Extracted audio from: {os.path.basename(audio_file)}")
+                print(f"Saved audio features: {output_path}")
+            else:
+                wx.MessageBox(f'Error extracting audio features from {audio_file}: {error}', 'Error', wx.OK | wx.ICON_ERROR)
+            self.update_progress(int(done / total_files * 100))
 
         wx.MessageBox("Audio feature extraction completed!", "Success", wx.OK | wx.ICON_INFORMATION)
         self.update_progress(0)  # Reset progress bar
@@ -593,31 +686,19 @@ class VideoToWavConverter(wx.Frame):
         try:
             if progress_callback:
                 progress_callback(0)
-            
-            feature_set_name = opensmile.FeatureSet.ComParE_2016
-            feature_level_name = opensmile.FeatureLevel.LowLevelDescriptors
 
-            if progress_callback:
-                progress_callback(25)
-            
-            smile = opensmile.Smile(feature_set=feature_set_name, feature_level=feature_level_name)
-            y, sr = librosa.load(filepath)
-            
-            if progress_callback:
-                progress_callback(50)
-            
-            features = smile.process_signal(y, sr)
-            
-            if progress_callback:
-                progress_callback(75)
+            output_path = extract_audio_features_file(
+                filepath,
+                self.extracted_audio_folder,
+                opensmile.FeatureSet.ComParE_2016,
+                opensmile.FeatureLevel.LowLevelDescriptors,
+                self.audio_features_format,
+            )
 
-            output_csv = os.path.join(self.extracted_audio_folder, os.path.splitext(os.path.basename(filepath))[0] + ".csv")
-            features.to_csv(output_csv, index=False)
-            
             if progress_callback:
                 progress_callback(100)
 
-            print(f"Saved audio features: {output_csv}")
+            print(f"Saved audio features: {output_path}")
 
         except Exception as e:
             wx.MessageBox(f'Error extracting audio features from {filepath}: {e}', 'Error', wx.OK | wx.ICON_ERROR)
@@ -648,98 +729,305 @@ class VideoToWavConverter(wx.Frame):
 
         #print(f"Found {total_files} WAV files for transcription.")
 
-        for i, audio_file in enumerate(audio_files):
-            #print(f"Starting transcription for: {audio_file}")
-            #file_name = os.path.basename(audio_file)
-            self.set_status_message(f"🗣️ Transcribing: {os.path.basename(audio_file)}")
-            
-            # Create progress callback for this audio file
-            def make_progress_callback(audio_index, total_audios):
-                def progress_callback(transcription_progress):
-                    # Calculate overall progress: (audio_index-1)/total_audios + transcription_progress/total_audios
-                    overall_progress = int(((audio_index - 1) / total_audios) * 100 + (transcription_progress / total_audios))
-                    self.update_progress(overall_progress)
-                return progress_callback
-        
-            try:
-                self.extract_transcripts(audio_file, progress_callback=make_progress_callback(i + 1, total_files))
-            except Exception as e:
-                print(f"Error processing {audio_file}: {e}")
+        # Shortest files first so each decoder batch holds similar-length audio with little padding;
+        # transcripts are written per file name, so the processing order is not visible in the output
+        audio_files = sorted(audio_files, key=_audio_duration)
+        print(f"Transcribing {total_files} file(s) in order of duration")
+
+        # Load the model once for the whole batch instead of once per file
+        self.set_status_message("🗣️ Loading Whisper model...")
+        try:
+            self._load_whisper_model()
+        except Exception as e:
+            print(f" Error loading Whisper model: {e}")
+            wx.MessageBox(f'Error loading Whisper model: {e}', 'Error', wx.OK | wx.ICON_ERROR)
+            return
+
+        handled = 0
+        try:
+            for audio_file, pieces, error in self._transcribe_many(audio_files):
+                self.set_status_message(f"🗣️ Transcribing: {os.path.basename(audio_file)}")
+                if error is None:
+                    try:
+                        self._write_transcript(audio_file, pieces)
+                    except Exception as e:
+                        error = e
+                if error is not None:
+                    print(f"Error processing {audio_file}: {error}")
+                    wx.MessageBox(f'Error transcribing {audio_file}: {error}', 'Error', wx.OK | wx.ICON_ERROR)
+                handled += 1
+                self.update_progress(int(handled / total_files * 100))
+        except Exception as e:
+            # Files are yielded in order, so everything after the last handled file was not transcribed
+            not_transcribed = "\n".join(audio_files[handled:])
+            print(f"Error during batch transcription: {e}")
+            wx.MessageBox(f'Error during batch transcription: {e}\n\nNot transcribed:\n{not_transcribed}', 'Error', wx.OK | wx.ICON_ERROR)
+            self.update_progress(0)  # Reset progress bar
+            return
 
         #print("All transcriptions completed.")
         #self.set_status_message("Transcription complete.")
         wx.MessageBox("Transcription extraction completed!", "Success", wx.OK | wx.ICON_INFORMATION)
         self.update_progress(0)  # Reset progress bar
 
-    def extract_transcripts(self, filepath, progress_callback=None):
-        """Transcribes a single WAV file using Whisper."""
-        try:
-            if progress_callback:
-                progress_callback(0)
-            
-            print(f"Loading Whisper model for {filepath}...")
-            device = "cuda:0" if torch.cuda.is_available() else "cpu"
-            torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-
-            if progress_callback:
-                progress_callback(10)
+    def _load_whisper_model(self):
+        """Load the Whisper model, preferring the CTranslate2 (faster-whisper) backend when installed."""
+        if self.whisper_pipe is not None:
+            return
 
-            model_id = "distil-whisper/distil-large-v3"
+        device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
 
-            if progress_callback:
-                progress_callback(20)
+        if self.whisper_backend not in ("auto", "faster-whisper", "transformers"):
+            raise ValueError(f"Unknown Whisper backend: {self.whisper_backend}")
+        if self.whisper_backend == "faster-whisper" and not faster_whisper_available:
+            raise RuntimeError("The faster-whisper backend was requested but faster_whisper is not installed")
+        use_faster_whisper = self.whisper_backend == "faster-whisper" or (self.whisper_backend == "auto" and faster_whisper_available)
 
-            model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                model_id, torch_dtype=torch_dtype, low_cpu_mem_usage=True, use_safetensors=True
+        if use_faster_whisper:
+            # int8 weights with fp16 activations on GPU, plain int8 on CPU
+            compute_type = "int8_float16" if torch.cuda.is_available() else "int8"
+            key = ("distil-large-v3", device, compute_type)
+        else:
+            key = ("distil-whisper/distil-large-v3", device, str(torch_dtype))
+
+        # Weights are shared by every instance so reopening the window does not reload them
+        if key not in VideoToWavConverter._whisper_cache:
+            if use_faster_whisper:
+                VideoToWavConverter._whisper_cache[key] = self._build_faster_whisper(device, compute_type)
+            else:
+                VideoToWavConverter._whisper_cache[key] = self._build_transformers_whisper(key[0], device, torch_dtype)
+        self.whisper_model, self.whisper_pipe, self.vad = VideoToWavConverter._whisper_cache[key]
+        self.use_faster_whisper = use_faster_whisper
+
+    @classmethod
+    def clear_caches(cls):
+        """Drop the shared Whisper models; memory is freed once no instance still holds them."""
+        cls._whisper_cache.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def _build_faster_whisper(device, compute_type):
+        """Build the faster-whisper model and its batched pipeline; VAD is handled inside the pipeline."""
+        whisper_model = WhisperModel("distil-large-v3", device=device.split(":")[0], compute_type=compute_type)
+        return whisper_model, BatchedInferencePipeline(model=whisper_model), None
+
+    @staticmethod
+    def _build_transformers_whisper(model_id, device, torch_dtype):
+        """Build the transformers Whisper pipeline and the Silero VAD used to trim its input."""
+        dispatched = torch.cuda.is_available() and torch.cuda.get_device_properties(0).total_memory < WHISPER_OFFLOAD_VRAM_BYTES
+
+        if device == "cpu" and onnxruntime_available:
+            # ONNX Runtime's fused CPU kernels beat eager fp32 PyTorch
+            session_options = ort.SessionOptions()
+            session_options.intra_op_num_threads = os.cpu_count()
+            onnx_dir = os.path.join(ONNX_CACHE_DIR, model_id.replace("/", "--"))
+            if os.path.isdir(onnx_dir):
+                whisper_model = ORTModelForSpeechSeq2Seq.from_pretrained(
+                    onnx_dir, provider="CPUExecutionProvider", session_options=session_options
+                )
+            else:
+                whisper_model = ORTModelForSpeechSeq2Seq.from_pretrained(
+                    model_id, export=True, provider="CPUExecutionProvider", session_options=session_options
+                )
+                # Save next to the final location and rename, so an interrupted save is never loaded
+                whisper_model.save_pretrained(onnx_dir + ".part")
+                os.replace(onnx_dir + ".part", onnx_dir)
+        else:
+            # Small GPUs: accelerate keeps the layers that fit on the GPU and offloads the rest to host
+            # memory; the hf_device_map it records tells the pipeline not to move the model itself
+            whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                model_id, torch_dtype=torch_dtype, low_cpu_mem_usage=True, use_safetensors=True, attn_implementation="sdpa",
+                device_map="auto" if dispatched else None,
             )
-            model.to(device)
-
-            if progress_callback:
-                progress_callback(40)
+            if not dispatched:
+                whisper_model.to(device)
+
+        # Only layers accelerate actually placed on the host are offloaded; the whole model usually fits
+        device_map = getattr(whisper_model, "hf_device_map", None) or {}
+        offloaded = any(d in ("cpu", "disk") for d in device_map.values())
+
+        # Offload hooks swap weights in and out on every call, which a compiled graph cannot follow;
+        # the inductor backend also needs Triton, which is not available on Windows
+        compiled = torch.cuda.is_available() and not offloaded and importlib.util.find_spec("triton") is not None
+        if compiled:
+            eager_forward = whisper_model.forward
+            # A static KV cache keeps decoder shapes fixed so the compiled graph is reused across steps
+            whisper_model.generation_config.cache_implementation = "static"
+            whisper_model.forward = torch.compile(whisper_model.forward, mode="reduce-overhead", fullgraph=True)
+
+        processor = AutoProcessor.from_pretrained(model_id)
+
+        # Compute log-mel features with torch.stft on the model's device (cuFFT on GPU)
+        feature_extractor = _DeviceWhisperFeatureExtractor.from_pretrained(model_id)
+        feature_extractor.device = device
+
+        whisper_pipe = pipeline(
+            "automatic-speech-recognition",
+            model=whisper_model,
+            tokenizer=processor.tokenizer,
+            feature_extractor=feature_extractor,
+            max_new_tokens=128,
+            chunk_length_s=25,
+            batch_size=16,
+            torch_dtype=torch_dtype,
+            # A dispatched model is already placed; the pipeline takes its device from hf_device_map
+            device=None if dispatched else device,
+        )
+
+        if torch.cuda.is_available():
+            # Warm up on 30 s of silence so compilation happens while loading, not on the first file
+            silence = {"raw": np.zeros(30 * AUDIO_SAMPLE_RATE, dtype=np.float32), "sampling_rate": AUDIO_SAMPLE_RATE}
+            try:
+                whisper_pipe(silence)
+            except Exception as e:
+                if not compiled:
+                    raise
+                # Compilation errors only surface on the first call; fall back to eager mode
+                print(f"torch.compile failed, running Whisper eagerly: {e}")
+                whisper_model.forward = eager_forward
+                whisper_model.generation_config.cache_implementation = None
+                whisper_pipe(silence)
+
+        # Silero VAD cuts silence before the transformers pipeline sees the audio
+        # (faster-whisper runs the same model internally); transcription still works without it
+        try:
+            vad_model, vad_utils = torch.hub.load('snakers4/silero-vad', 'silero_vad')
+            get_speech_timestamps, _, _, _, collect_chunks = vad_utils
+            vad = (vad_model, get_speech_timestamps, collect_chunks)
+        except Exception as e:
+            print(f"Silero VAD unavailable, transcribing full audio: {e}")
+            vad = None
+
+        return whisper_model, whisper_pipe, vad
+
+    def _transcribe(self, filepath):
+        """Yield the transcript of a single audio file piece by piece as the loaded Whisper backend decodes it."""
+        # Decode in-process and hand over the waveform so Whisper does not spawn ffmpeg to re-decode the file
+        y, sr = load_audio(filepath)
+        if self.use_faster_whisper:
+            # Only voiced regions are decoded; pauses shorter than 1 s stay inside a chunk
+            segments, _ = self.whisper_pipe.transcribe(
+                y, batch_size=16, word_timestamps=False, vad_filter=True, vad_parameters={"min_silence_duration_ms": 1000}
+            )
+            # Segments are decoded lazily, so each one can be written out as soon as it is ready
+            for segment in segments:
+                yield segment.text
+            return
+        with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=torch.float16, enabled=torch.cuda.is_available()):
+            yield self.whisper_pipe({"raw": self._drop_silence(y), "sampling_rate": sr})['text']
+
+    def _drop_silence(self, y):
+        """Keep only the speech regions of a 16 kHz waveform, as found by Silero VAD."""
+        if self.vad is None:
+            return y
+        vad_model, get_speech_timestamps, collect_chunks = self.vad
+        wav = torch.from_numpy(y)
+        speech = get_speech_timestamps(wav, vad_model, sampling_rate=AUDIO_SAMPLE_RATE, min_silence_duration_ms=1000)
+        if not speech:
+            return y
+        return collect_chunks(speech, wav).numpy()
+
+    def _transcribe_many(self, audio_files):
+        """Yield (audio_file, transcript pieces, error) for several files in order, batching across files when the backend allows it.
+
+        A file that cannot be loaded or decoded is yielded with its error and no pieces; the other files are still transcribed.
+        """
+        if self.use_faster_whisper:
+            # BatchedInferencePipeline batches the chunks of one file per call
+            for audio_file in audio_files:
+                yield audio_file, self._transcribe(audio_file), None
+            return
 
-            processor = AutoProcessor.from_pretrained(model_id)
+        # Files in the order they were handed to the pipeline, with the error of any that failed to load
+        loaded = collections.deque()
+        remaining = iter(audio_files)
+
+        def inputs():
+            for audio_file in remaining:
+                try:
+                    y, sr = load_audio(audio_file)
+                    y = self._drop_silence(y)
+                except Exception as e:
+                    loaded.append((audio_file, e))
+                    continue
+                loaded.append((audio_file, None))
+                yield {"raw": y, "sampling_rate": sr}
+
+        # A generator input makes the transformers pipeline stream results while packing
+        # chunks from consecutive files into the same decoder batch
+        try:
+            with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=torch.float16, enabled=torch.cuda.is_available()):
+                for result in self.whisper_pipe(inputs(), batch_size=16):
+                    # Failures are reported in file order, ahead of the result of the next file that loaded
+                    while loaded[0][1] is not None:
+                        audio_file, error = loaded.popleft()
+                        yield audio_file, None, error
+                    audio_file, _ = loaded.popleft()
+                    yield audio_file, (result['text'],), None
+        except Exception as e:
+            # An inference error (e.g. CUDA out of memory) ends the shared stream; it is reported for
+            # the file being decoded, and the files after it are transcribed one at a time
+            while loaded and loaded[0][1] is not None:
+                audio_file, error = loaded.popleft()
+                yield audio_file, None, error
+            if not loaded:
+                raise
+            print(f"Error during batch transcription, transcribing the remaining files one at a time: {e}")
+            audio_file, _ = loaded.popleft()
+            yield audio_file, None, e
+            for audio_file, error in loaded:
+                if error is None:
+                    yield audio_file, self._transcribe(audio_file), None
+                else:
+                    yield audio_file, None, error
+            for audio_file in remaining:
+                yield audio_file, self._transcribe(audio_file), None
+            return
 
-            if progress_callback:
-                progress_callback(50)
+        for audio_file, error in loaded:
+            yield audio_file, None, error
 
-            pipe = pipeline(
-                "automatic-speech-recognition",
-                model=model,
-                tokenizer=processor.tokenizer,
-                feature_extractor=processor.feature_extractor,
-                max_new_tokens=128,
-                chunk_length_s=25,
-                batch_size=16,
-                torch_dtype=torch_dtype,
-                device=device,
-            )
+    def _write_transcript(self, filepath, pieces):
+        """Stream the transcript pieces of an audio file into the transcripts folder."""
+        output_txt = os.path.join(self.extracted_transcripts_folder, os.path.splitext(os.path.basename(filepath))[0] + ".txt")
 
-            if progress_callback:
-                progress_callback(70)
+        try:
+            with open(output_txt, 'w') as f:
+                for piece in pieces:
+                    f.write(piece)
+        except Exception:
+            # Do not leave a truncated transcript behind
+            if os.path.exists(output_txt):
+                os.remove(output_txt)
+            raise
 
-            print(f"Transcribing {filepath}...")
-            result = pipe(filepath)
-            transcript = result['text']
+        print(f"Saved transcript: {output_txt}")
 
+    def extract_transcripts(self, filepath, progress_callback=None):
+        """Transcribes a single WAV file using Whisper."""
+        try:
             if progress_callback:
-                progress_callback(90)
+                progress_callback(0)
+            
+            print(f"Loading Whisper model for {filepath}...")
+            self._load_whisper_model()
 
-            output_txt = os.path.join(self.extracted_transcripts_folder, os.path.splitext(os.path.basename(filepath))[0] + ".txt")
+            if progress_callback:
+                progress_callback(70)
 
-            with open(output_txt, 'w') as f:
-                f.write(transcript)
+            print(f"Transcribing {filepath}...")
+            self._write_transcript(filepath, self._transcribe(filepath))
 
             if progress_callback:
                 progress_callback(100)
 
-            print(f"Saved transcript: {output_txt}")
-
         except Exception as e:
             print(f" Error transcribing {filepath}: {e}")
             wx.MessageBox(f'Error transcribing {filepath}: {e}', 'Error', wx.OK | wx.ICON_ERROR)
 
 
-
 def main():
     app = wx.App()
     frm = VideoToWavConverter(None)
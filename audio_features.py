@@ -0,0 +1,98 @@
+'''
+This is the script for loading audio and extracting OpenSMILE features from it
+
+Kept free of the GUI and deep learning imports so that the worker processes used for
+feature extraction start quickly and stay small.
+
+'''
+
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import librosa
+import numpy as np
+import opensmile
+import soundfile as sf
+
+
+# ComParE_2016 and Whisper both work on 16 kHz audio
+AUDIO_SAMPLE_RATE = 16000
+
+
+def load_audio(filepath, sr=AUDIO_SAMPLE_RATE):
+    """Load a mono float32 waveform at `sr`, reading the file directly when no resampling is needed."""
+    try:
+        info = sf.info(filepath)
+        if info.samplerate == sr and info.channels == 1:
+            y, _ = sf.read(filepath, dtype='float32', always_2d=False)
+            return y, sr
+    except RuntimeError:
+        pass  # Format not readable by soundfile, let librosa decode it
+    return librosa.load(filepath, sr=sr, mono=True, dtype=np.float32)
+
+
+# opensmile.Smile instances per (feature set, feature level), built once per process
+_smile_cache = {}
+
+
+def _get_smile(feature_set, feature_level):
+    """Return this process's Smile for the given configuration, creating it on first use."""
+    key = (feature_set, feature_level)
+    smile = _smile_cache.get(key)
+    if smile is None:
+        smile = opensmile.Smile(feature_set=feature_set, feature_level=feature_level)
+        _smile_cache[key] = smile
+    return smile
+
+
+def extract_audio_features_file(filepath, output_folder, feature_set, feature_level, output_format="csv"):
+    """Extract OpenSMILE features from one WAV file and save them as CSV or Parquet.
+
+    Kept at module level so it can run in a worker process; opensmile.Smile is not
+    picklable, so each worker builds its own from the feature set/level enums.
+    """
+    smile = _get_smile(feature_set, feature_level)
+    y, sr = load_audio(filepath)
+    features = smile.process_signal(y, sr)
+
+    base_path = os.path.join(output_folder, os.path.splitext(os.path.basename(filepath))[0])
+    if output_format == "parquet":
+        output_path = base_path + ".parquet"
+        features.to_parquet(output_path, engine='pyarrow', compression='snappy', index=False)
+    else:
+        output_path = base_path + ".csv"
+        features.to_csv(output_path, index=False)
+    return output_path
+
+
+def extract_audio_features_files(filepaths, output_folder, feature_set, feature_level, output_format="csv"):
+    """Extract features from several WAV files, one worker process per CPU core.
+
+    Yields (filepath, output_path, error) as each file finishes; error is None on success.
+    """
+    max_workers = min(os.cpu_count() or 1, len(filepaths))
+
+    # "spawn" keeps the workers clear of the parent's wx/torch state, but a spawned worker first
+    # re-imports the parent's __main__ (app.py and everything it imports). While the workers start,
+    # __main__ is pointed at this module so they re-import only this one instead.
+    main_module = sys.modules['__main__']
+    main_spec = getattr(main_module, '__spec__', None)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        main_module.__spec__ = __spec__
+        try:
+            futures = {
+                executor.submit(extract_audio_features_file, filepath, output_folder, feature_set, feature_level, output_format): filepath
+                for filepath in filepaths
+            }
+        finally:
+            main_module.__spec__ = main_spec
+
+        for future in as_completed(futures):
+            filepath = futures[future]
+            try:
+                output_path = future.result()
+            except Exception as e:
+                yield filepath, None, e
+            else:
+                yield filepath, output_path, None
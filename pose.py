@@ -5,27 +5,240 @@ using MediaPipe and YOLO
 '''
 
 import os
+import csv
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import mediapipe as mp
-import pandas as pd
+import numpy as np
 from yolov5 import YOLOv5
 
+# Optional: PyAV decodes with libav's threaded decoder and converts straight to RGB
+try:
+    import av
+    av_available = True
+except ImportError:
+    av_available = False
+
 def ensure_yolov5_weights():
     """Ensure yolov5s weights exist without triggering network calls at import in other modules."""
     weights_path = "yolov5s.pt"
     if not os.path.exists(weights_path):
         try:
             import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
             url = "https://github.com/ultralytics/yolov5/releases/download/v6.0/yolov5s.pt"
-            response = requests.get(url)
-            response.raise_for_status()  # Raise exception for HTTP errors
-            with open(weights_path, "wb") as f:
-                f.write(response.content)
+            # Stream to a temporary file so a partial download is never mistaken for the weights
+            partial_path = weights_path + ".part"
+            with requests.Session() as session:
+                session.mount("https://", HTTPAdapter(max_retries=Retry(total=5, backoff_factor=0.5)))
+                with session.get(url, stream=True, timeout=30) as response:
+                    response.raise_for_status()  # Raise exception for HTTP errors
+                    with open(partial_path, "wb") as f:
+                        for chunk in response.iter_content(1 << 20):
+                            f.write(chunk)
+            os.replace(partial_path, weights_path)
             print(f"Downloaded YOLOv5 weights to {weights_path}")
         except Exception as e:
+            if os.path.exists(weights_path + ".part"):
+                os.remove(weights_path + ".part")
             raise RuntimeError(f"Failed to download YOLOv5 weights: {e}")
 
 
+def _landmarks_to_array(landmarks, out=None):
+    """Return MediaPipe pose landmarks as a (33, 4) array of x, y, z, visibility, filling `out` if given."""
+    values = np.fromiter(
+        itertools.chain.from_iterable((lmk.x, lmk.y, lmk.z, lmk.visibility) for lmk in landmarks.landmark),
+        dtype=np.float64,
+        count=4 * len(landmarks.landmark),
+    )
+    if out is None:
+        return values.reshape(-1, 4)
+    out.reshape(-1)[:] = values
+    return out
+
+
+def _read_frames(cap):
+    """Yield BGR frames from an OpenCV capture until it runs out."""
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+
+
+class VideoSource:
+    """Iterate the frames of a video file as RGB or BGR arrays.
+
+    Decodes with PyAV when it is installed (threaded decoding that releases the GIL,
+    converting straight to the requested pixel format) and with cv2.VideoCapture otherwise.
+    PyAV does not apply rotation metadata, so rotated videos (e.g. portrait phone recordings)
+    are always read with cv2.VideoCapture, which returns them upright.
+    """
+
+    def __init__(self, video_path, pixel_format="bgr24"):
+        self.pixel_format = pixel_format  # "rgb24" or "bgr24"
+        self._container = None
+        self._cap = None
+
+        # OpenCV's FFmpeg backend reports the stream's rotation (display matrix) in degrees; files
+        # it cannot open stay on the capture, which then yields no frames, as cv2 always did
+        cap = cv2.VideoCapture(video_path)
+        if av_available and cap.isOpened() and not cap.get(cv2.CAP_PROP_ORIENTATION_META):
+            try:
+                self._open_av(video_path)
+            except Exception as e:
+                print(f"PyAV could not open {video_path}, reading it with OpenCV: {e}")
+                if self._container is not None:
+                    self._container.close()
+                    self._container = None
+            else:
+                cap.release()
+
+        if self._container is None:
+            self._cap = cap
+            self.width = int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+            self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if self.total_frames <= 0 and self.fps > 0:
+                # Fallback: estimate frames from FPS and duration
+                duration = self._cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                self.total_frames = int(self.fps * duration)
+
+    def _open_av(self, video_path):
+        """Open the first video stream with PyAV and read its size, frame rate and length."""
+        self._container = av.open(video_path)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        self.width = self._stream.codec_context.width
+        self.height = self._stream.codec_context.height
+        self.fps = float(self._stream.average_rate or 0)
+        self.total_frames = self._stream.frames
+        if self.total_frames <= 0 and self._stream.duration and self.fps > 0:
+            # Fallback: estimate frames from FPS and duration
+            self.total_frames = int(self._stream.duration * self._stream.time_base * self.fps)
+
+    def __iter__(self):
+        if self._container is not None:
+            try:
+                for frame in self._container.decode(self._stream):
+                    yield frame.to_ndarray(format=self.pixel_format)
+            except av.error.FFmpegError as e:
+                # A decode error ends the video, as a failed cap.read() does on the OpenCV path
+                print(f"Stopped decoding after a PyAV error: {e}")
+        else:
+            for frame in _read_frames(self._cap):
+                if self.pixel_format == "rgb24":
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                yield frame
+
+    def release(self):
+        if self._container is not None:
+            self._container.close()
+        else:
+            self._cap.release()
+
+
+def _prefetch(iterable, maxsize):
+    """Yield the items of `iterable` while a background thread produces the next ones.
+
+    Used to decode video frames while the main thread runs pose inference.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    done = object()
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            items.put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # Unblock and wait for the producer so the source can be released safely
+        stop.set()
+        while thread.is_alive():
+            try:
+                items.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+class _BackgroundWriter:
+    """Encode frames with a cv2.VideoWriter on a background thread.
+
+    An error raised while encoding is re-raised from the next write() or from release().
+    """
+
+    def __init__(self, out, maxsize):
+        self._out = out
+        self._frames = queue.Queue(maxsize=maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._frames.get()
+            if frame is None:
+                return
+            # After an error, keep draining the queue so write() never blocks on a full queue
+            if self._error is None:
+                try:
+                    self._out.write(frame)
+                except Exception as e:
+                    self._error = e
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._frames.put(frame)
+
+    def release(self):
+        """Flush the queued frames and release the underlying writer."""
+        self._frames.put(None)
+        self._thread.join()
+        self._out.release()
+        if self._error is not None:
+            raise self._error
+
+
+def _batched(iterable, size):
+    """Yield lists of up to `size` consecutive items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
 # Core pose processor class
 class PoseProcessor:
     def __init__(self, output_csv_folder, output_video_folder=None, status_callback=None):
@@ -40,6 +253,26 @@ class PoseProcessor:
         
         # Initialize YOLO lazily (only when needed for multi-person mode)
         self.yolo = None
+        # Frames sent to YOLO per forward pass in multi-person mode
+        self.yolo_batch_size = 8
+        # Frames decoded ahead of (and queued for encoding behind) pose inference
+        self.prefetch_frames = 16
+        # Longest side (pixels) of the frames given to YOLO and MediaPipe; larger videos are downscaled
+        self.max_inference_side = 720
+
+        # Optional: skip pose inference when an image barely differs from the last one processed for
+        # the same person (mean absolute difference of 32x32 thumbnails below the threshold, e.g. 2.0),
+        # for at most pose_reuse_limit frames in a row. Off by default, since reused rows cannot be told
+        # apart from real inferences. In multi-person mode a "person" is a YOLO detection index, which
+        # is ordered by confidence and is not guaranteed to follow the same individual between frames.
+        self.pose_reuse_threshold = None
+        self.pose_reuse_limit = 5
+        self._pose_cache = {}
+
+        # Multi-person mode gives each person slot its own Pose (MediaPipe graphs are stateful and
+        # not thread-safe) so crops can run in parallel; created on first use
+        self._person_poses = {}
+        self._pose_pool = None
 
     def set_multi_person_mode(self, enabled: bool):
         """Enable or disable multi-person pose mode."""
@@ -58,86 +291,106 @@ class PoseProcessor:
                     self.status_callback(f"❌ Failed to load YOLOv5: {e}")
                 raise RuntimeError(f"Failed to initialize YOLOv5: {e}")
 
+    def _process_pose(self, person_id, image_rgb):
+        """Return pose landmarks for an image, reusing the previous result for `person_id` if the image is unchanged."""
+        if self.pose_reuse_threshold is None or image_rgb.size == 0:
+            return self._pose_for(person_id).process(image_rgb).pose_landmarks
+
+        thumbnail = cv2.resize(image_rgb, (32, 32), interpolation=cv2.INTER_AREA).astype(np.int16)
+        cached = self._pose_cache.get(person_id)
+        if cached is not None:
+            last_thumbnail, last_landmarks, reused = cached
+            if reused < self.pose_reuse_limit and np.mean(np.abs(thumbnail - last_thumbnail)) < self.pose_reuse_threshold:
+                self._pose_cache[person_id] = (last_thumbnail, last_landmarks, reused + 1)
+                return last_landmarks
+
+        pose_landmarks = self._pose_for(person_id).process(image_rgb).pose_landmarks
+        self._pose_cache[person_id] = (thumbnail, pose_landmarks, 0)
+        return pose_landmarks
+
+    def _pose_for(self, person_id):
+        """Return the Pose instance that tracks `person_id`."""
+        if not self.enable_multi_person_pose:
+            return self.pose
+        pose = self._person_poses.get(person_id)
+        if pose is None:
+            pose = mp.solutions.pose.Pose(static_image_mode=False, min_detection_confidence=0.5, model_complexity=1)
+            self._person_poses[person_id] = pose
+        return pose
+
+    def _reset_person_poses(self):
+        """Drop per-person Pose instances so tracking does not carry over between videos."""
+        for pose in self._person_poses.values():
+            pose.close()
+        self._person_poses = {}
+
+    def close(self):
+        """Stop the pose thread pool and close the per-person Pose instances."""
+        if self._pose_pool is not None:
+            self._pose_pool.shutdown()
+            self._pose_pool = None
+        self._reset_person_poses()
+
+    def _process_person_poses(self, crops):
+        """Run pose inference on each person's crop, in parallel threads; MediaPipe releases the GIL while inferring."""
+        if len(crops) <= 1:
+            return [self._process_pose(person_id, crop) for person_id, crop in enumerate(crops)]
+        if self._pose_pool is None:
+            self._pose_pool = ThreadPoolExecutor(max_workers=4)
+        return list(self._pose_pool.map(self._process_pose, range(len(crops)), crops))
+
+    def _inference_size(self, width, height):
+        """Return the (width, height) that frames are downscaled to before detection and pose inference."""
+        scale = min(1.0, self.max_inference_side / max(width, height, 1))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def _detect_people(self, images_rgb, scale=(1.0, 1.0)):
+        """Run YOLO once on a batch of RGB frames and return the person boxes found in each frame.
+
+        Boxes are multiplied by `scale` (x, y), which maps boxes found on downscaled frames back
+        onto the full-resolution frames.
+        """
+        box_scale = np.array([scale[0], scale[1], scale[0], scale[1]])
+        results = self.yolo.predict(images_rgb, size=640)
+        person_boxes = []
+        for boxes in results.xyxy:
+            # One device-to-host copy per frame, then keep class 0 (person) rows as (N, 4) int boxes
+            detections = boxes.detach().cpu().numpy()
+            person_boxes.append((detections[detections[:, 5].astype(int) == 0, :4] * box_scale).astype(np.int32))
+        return person_boxes
+
     def extract_pose_features(self, video_path, progress_callback=None):
         """Extract pose features from video, saving one CSV per person."""
-        cap = cv2.VideoCapture(video_path)
+        self._pose_cache = {}
+        self._reset_person_poses()
+
+        # Pose inference only needs RGB, so decode straight to it
+        source = VideoSource(video_path, pixel_format="rgb24")
         frame_idx = 0
-        keypoints_by_person = {} # Dictionary to store keypoints per person
         
         # Get video dimensions for coordinate normalization
-        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        w = source.width
+        h = source.height
+
+        # YOLO and single-person pose run on frames downscaled to this size; landmarks are normalized
+        # to [0,1], so they still describe the original frame. Person crops are cut from the
+        # full-resolution frame, so YOLO boxes are scaled back up first.
+        iw, ih = self._inference_size(w, h)
+        downscale = (iw, ih) != (w, h)
         
         # Get total frame count for progress tracking
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames <= 0:
-            # Fallback: estimate frames from FPS and duration
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            if fps > 0:
-                duration = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-                total_frames = int(fps * duration)
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-              
-            if self.status_callback:
-                self.status_callback(f"📸 Extracting pose from: {os.path.basename(video_path)} (Frame {frame_idx + 1}/{total_frames})")
-
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            if self.enable_multi_person_pose:
-                # Ensure YOLO is loaded
-                self._ensure_yolo()
-                
-                # Detect multiple people using YOLO
-                results = self.yolo.predict(image_rgb, size=640)
-                boxes = results.xyxy[0]
-                person_boxes = [b[:4].int().tolist() for b in boxes if int(b[5]) == 0]
-                
-                # Check if any people were detected
-                if not person_boxes:
-                    if self.status_callback:
-                        self.status_callback(f"⚠️ No people detected in frame {frame_idx}")
-                    continue
-                
-                # Process each detected person
-                for person_id, (x1, y1, x2, y2) in enumerate(person_boxes):
-                    cropped = image_rgb[y1:y2, x1:x2]
-                    result = self.pose.process(cropped)
-
-                    if result.pose_landmarks:
-                        row = [frame_idx, person_id]
-                        for lmk in result.pose_landmarks.landmark:
-                            # Transform coordinates back to original frame and normalize to [0,1]
-                            orig_x = ((lmk.x * (x2 - x1)) + x1) / w
-                            orig_y = ((lmk.y * (y2 - y1)) + y1) / h
-                            row.extend([orig_x, orig_y, lmk.z, lmk.visibility])
-                        if person_id not in keypoints_by_person:
-                            keypoints_by_person[person_id] = []
-                        keypoints_by_person[person_id].append(row)
+        total_frames = source.total_frames
 
-            else:
-                # Single-person mode
-                result = self.pose.process(image_rgb)
-                if result.pose_landmarks:
-                    row = [frame_idx, 0]
-                    for lmk in result.pose_landmarks.landmark:
-                        row.extend([lmk.x, lmk.y, lmk.z, lmk.visibility])
-                    keypoints_by_person[0] = keypoints_by_person.get(0, []) + [row]
-
-            frame_idx += 1
-            
-            # Update progress if callback provided
-            if progress_callback and total_frames > 0:
-                progress_percent = int((frame_idx / total_frames) * 100)
-                progress_callback(progress_percent)
-
-        cap.release()
-        
-        
-        # Define DataFrame column names
+        if self.enable_multi_person_pose:
+            # Ensure YOLO is loaded
+            self._ensure_yolo()
+
+        # Multi-person mode reads frames in batches so YOLO runs one forward pass per batch
+        batch_size = self.yolo_batch_size if self.enable_multi_person_pose else 1
+
+        video_name = os.path.basename(video_path)
+
+        # Define CSV column names
         columns = ['frame', 'person_id']
         names = [
             'Nose', 'Left_eye_inner', 'Left_eye', 'Left_eye_outer', 'Right_eye_inner', 
@@ -152,15 +405,82 @@ class PoseProcessor:
             columns.extend([f"{n}_x", f"{n}_y", f"{n}_z", f"{n}_confidence"])
 
         suffix = "_multi" if self.enable_multi_person_pose else ""
-        base_filename = os.path.splitext(os.path.basename(video_path))[0] + suffix
-        
-        
-        # Save separate CSV for each person
-        for person_id, keypoints in keypoints_by_person.items():
-            df = pd.DataFrame(keypoints, columns=columns)
-            filename = f"{base_filename}_ID_{int(person_id)}.csv"
-            csv_path = os.path.join(self.output_csv_folder, filename)
-            df.to_csv(csv_path, index=False)
+        base_filename = os.path.splitext(video_name)[0] + suffix
+
+        # Rows are streamed to one CSV per person, opened when that person first appears
+        person_files = {}
+        person_writers = {}
+
+        def write_row(person_id, row):
+            writer = person_writers.get(person_id)
+            if writer is None:
+                filename = f"{base_filename}_ID_{int(person_id)}.csv"
+                f = open(os.path.join(self.output_csv_folder, filename), "w")
+                person_files[person_id] = f
+                writer = person_writers[person_id] = csv.writer(f, lineterminator="\n")
+                writer.writerow(columns)
+            writer.writerow(row)
+
+        # Keypoints are filled into one reused buffer and converted to a row in a single tolist() call
+        keypoints = np.empty((33, 4), dtype=np.float64)
+
+        # Decode on a background thread so reading overlaps pose inference
+        frames_iter = _prefetch(source, self.prefetch_frames)
+        try:
+            for frames_rgb in _batched(frames_iter, batch_size):
+                if downscale:
+                    images_rgb = [cv2.resize(frame, (iw, ih), interpolation=cv2.INTER_AREA) for frame in frames_rgb]
+                else:
+                    images_rgb = frames_rgb
+
+                if self.enable_multi_person_pose:
+                    # Detect multiple people using YOLO
+                    boxes_per_frame = self._detect_people(images_rgb, (w / iw, h / ih))
+
+                for i, (frame_rgb, image_rgb) in enumerate(zip(frames_rgb, images_rgb)):
+                    if self.status_callback:
+                        self.status_callback(f"📸 Extracting pose from: {video_name} (Frame {frame_idx + 1}/{total_frames})")
+
+                    if self.enable_multi_person_pose:
+                        person_boxes = boxes_per_frame[i]
+
+                        # Check if any people were detected
+                        if len(person_boxes) == 0:
+                            if self.status_callback:
+                                self.status_callback(f"⚠️ No people detected in frame {frame_idx}")
+                            continue
+
+                        # Process each detected person
+                        crops = [frame_rgb[y1:y2, x1:x2] for (x1, y1, x2, y2) in person_boxes]
+                        landmarks_per_person = self._process_person_poses(crops)
+                        for person_id, ((x1, y1, x2, y2), pose_landmarks) in enumerate(zip(person_boxes, landmarks_per_person)):
+                            if pose_landmarks:
+                                _landmarks_to_array(pose_landmarks, out=keypoints)
+                                # Transform coordinates back to original frame and normalize to [0,1]
+                                keypoints[:, 0] = (keypoints[:, 0] * (x2 - x1) + x1) / w
+                                keypoints[:, 1] = (keypoints[:, 1] * (y2 - y1) + y1) / h
+                                row = [frame_idx, person_id] + keypoints.ravel().tolist()
+                                write_row(person_id, row)
+
+                    else:
+                        # Single-person mode
+                        pose_landmarks = self._process_pose(0, image_rgb)
+                        if pose_landmarks:
+                            _landmarks_to_array(pose_landmarks, out=keypoints)
+                            row = [frame_idx, 0] + keypoints.ravel().tolist()
+                            write_row(0, row)
+
+                    frame_idx += 1
+
+                    # Update progress if callback provided
+                    if progress_callback and total_frames > 0:
+                        progress_percent = int((frame_idx / total_frames) * 100)
+                        progress_callback(progress_percent)
+        finally:
+            frames_iter.close()
+            source.release()
+            for f in person_files.values():
+                f.close()
 
         return
 
@@ -169,110 +489,134 @@ class PoseProcessor:
         if not self.output_video_folder:
             return None
 
-        cap = cv2.VideoCapture(video_path)
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._pose_cache = {}
+        self._reset_person_poses()
+
+        if self.enable_multi_person_pose:
+            # Ensure YOLO is loaded
+            self._ensure_yolo()
+
+        # Frames are drawn on and encoded in BGR, as cv2.VideoWriter expects
+        source = VideoSource(video_path, pixel_format="bgr24")
+        fps = int(source.fps)
+        w = source.width
+        h = source.height
         
         # Get total frame count for progress tracking
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        if total_frames <= 0:
-            # Fallback: estimate frames from FPS and duration
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            if fps > 0:
-                duration = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-                total_frames = int(fps * duration)
+        total_frames = source.total_frames
 
         suffix = "_multi" if self.enable_multi_person_pose else ""
         filename = os.path.splitext(os.path.basename(video_path))[0] + f"{suffix}_pose.mp4"
         out_path = os.path.join(self.output_video_folder, filename)
-        out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
 
         frame_idx = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
 
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            if self.enable_multi_person_pose:
-                # Ensure YOLO is loaded
-                self._ensure_yolo()
-                
-                # Use YOLO to detect person boxes
-                results = self.yolo.predict(image_rgb, size=640)
-                boxes = results.xyxy[0]
-                person_boxes = [b[:4].int().tolist() for b in boxes if int(b[5]) == 0]
-                
-                # Draw pose for each person
-                for (x1, y1, x2, y2) in person_boxes:
-                    cropped = image_rgb[y1:y2, x1:x2]
-                    result = self.pose.process(cropped)
-
-                    if result.pose_landmarks:
-                        try:
+        # Multi-person mode reads frames in batches so YOLO runs one forward pass per batch
+        batch_size = self.yolo_batch_size if self.enable_multi_person_pose else 1
+
+        # Detection and single-person pose run on a downscaled copy; landmarks are normalized, so
+        # they are drawn on the full-resolution frame unchanged. Person crops are cut from the
+        # full-resolution frame, so YOLO boxes are scaled back up first.
+        iw, ih = self._inference_size(w, h)
+
+        # RGB copies are written into reused buffers, one per frame of a batch
+        rgb_buffers = np.empty((batch_size, ih, iw, 3), dtype=np.uint8)
+
+        # Drawing style is the same for every frame, so build it once
+        draw_landmarks = self.drawing_utils.draw_landmarks
+        pose_connections = mp.solutions.pose.POSE_CONNECTIONS
+        landmark_spec = mp.solutions.drawing_utils.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=3)
+        connection_spec = mp.solutions.drawing_utils.DrawingSpec(color=(255, 0, 0), thickness=2)
+
+        # Encode on a background thread so writing overlaps pose inference
+        out = _BackgroundWriter(cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h)), self.prefetch_frames)
+        # Decode on a background thread so reading overlaps pose inference
+        frames_iter = _prefetch(source, self.prefetch_frames)
+        try:
+            for frames in _batched(frames_iter, batch_size):
+                if (iw, ih) != (w, h):
+                    small_frames = [cv2.resize(frame, (iw, ih), interpolation=cv2.INTER_AREA) for frame in frames]
+                else:
+                    small_frames = frames
+                images_rgb = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_buffers[i]) for i, frame in enumerate(small_frames)]
+
+                if self.enable_multi_person_pose:
+                    # Use YOLO to detect person boxes
+                    boxes_per_frame = self._detect_people(images_rgb, (w / iw, h / ih))
+
+                for i, (frame, image_rgb) in enumerate(zip(frames, images_rgb)):
+                    if self.enable_multi_person_pose:
+                        person_boxes = boxes_per_frame[i]
+
+                        # Draw pose for each person, cropping RGB copies from the full-resolution BGR frame
+                        crops = [np.ascontiguousarray(frame[y1:y2, x1:x2, ::-1]) for (x1, y1, x2, y2) in person_boxes]
+                        landmarks_per_person = self._process_person_poses(crops)
+                        for (x1, y1, x2, y2), pose_landmarks in zip(person_boxes, landmarks_per_person):
+                            if pose_landmarks:
+                                try:
+                                    # Debug output to verify landmarks are being detected
+                                    if self.status_callback:
+                                        self.status_callback(f"🎯 Drawing {len(pose_landmarks.landmark)} landmarks for person at ({x1},{y1})-({x2},{y2})")
+
+                                    # Create a copy of the original landmarks and transform coordinates
+                                    # We'll modify the copy for drawing, the original may be reused next frame
+                                    original_landmarks = type(pose_landmarks)()
+                                    original_landmarks.CopyFrom(pose_landmarks)
+
+                                    # Transform coordinates back to original frame
+                                    for lmk in original_landmarks.landmark:
+                                        # Transform from cropped coordinates to full frame coordinates
+                                        lmk.x = (lmk.x * (x2 - x1) + x1) / w
+                                        lmk.y = (lmk.y * (y2 - y1) + y1) / h
+
+                                    # Draw landmarks on the full frame with visible style
+                                    draw_landmarks(
+                                        frame,
+                                        original_landmarks,
+                                        pose_connections,
+                                        landmark_drawing_spec=landmark_spec,
+                                        connection_drawing_spec=connection_spec
+                                    )
+                                except Exception as e:
+                                    if self.status_callback:
+                                        self.status_callback(f"❌ Error drawing landmarks: {e}")
+                                    print(f"Error drawing landmarks: {e}")
+                            else:
+                                # Debug output when no landmarks detected
+                                if self.status_callback:
+                                    self.status_callback(f"⚠️ No landmarks detected for person at ({x1},{y1})-({x2},{y2})")
+
+                    else:
+                        # Single-person mode
+                        pose_landmarks = self._process_pose(0, image_rgb)
+                        if pose_landmarks:
                             # Debug output to verify landmarks are being detected
                             if self.status_callback:
-                                self.status_callback(f"🎯 Drawing {len(result.pose_landmarks.landmark)} landmarks for person at ({x1},{y1})-({x2},{y2})")
-                            
-                            # Create a copy of the original landmarks and transform coordinates
-                            # We'll modify the landmarks in place for drawing
-                            original_landmarks = result.pose_landmarks
-                            
-                            # Transform coordinates back to original frame
-                            for lmk in original_landmarks.landmark:
-                                # Transform from cropped coordinates to full frame coordinates
-                                lmk.x = (lmk.x * (x2 - x1) + x1) / w
-                                lmk.y = (lmk.y * (y2 - y1) + y1) / h
-                            
-                            # Draw landmarks on the full frame with visible style
-                            self.drawing_utils.draw_landmarks(
-                                frame, 
-                                original_landmarks, 
-                                mp.solutions.pose.POSE_CONNECTIONS,
-                                landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=3),
-                                connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(color=(255, 0, 0), thickness=2)
+                                self.status_callback(f"🎯 Drawing {len(pose_landmarks.landmark)} landmarks (single-person mode)")
+
+                            # Draw landmarks with visible style
+                            draw_landmarks(
+                                frame,
+                                pose_landmarks,
+                                pose_connections,
+                                landmark_drawing_spec=landmark_spec,
+                                connection_drawing_spec=connection_spec
                             )
-                        except Exception as e:
+                        else:
+                            # Debug output when no landmarks detected in single-person mode
                             if self.status_callback:
-                                self.status_callback(f"❌ Error drawing landmarks: {e}")
-                            print(f"Error drawing landmarks: {e}")
-                    else:
-                        # Debug output when no landmarks detected
-                        if self.status_callback:
-                            self.status_callback(f"⚠️ No landmarks detected for person at ({x1},{y1})-({x2},{y2})")
+                                self.status_callback("⚠️ No landmarks detected (single-person mode)")
 
-            else:
-                # Single-person mode
-                result = self.pose.process(image_rgb)
-                if result.pose_landmarks:
-                    # Debug output to verify landmarks are being detected
-                    if self.status_callback:
-                        self.status_callback(f"🎯 Drawing {len(result.pose_landmarks.landmark)} landmarks (single-person mode)")
-                    
-                    # Draw landmarks with visible style
-                    self.drawing_utils.draw_landmarks(
-                        frame, 
-                        result.pose_landmarks, 
-                        mp.solutions.pose.POSE_CONNECTIONS,
-                        landmark_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(color=(0, 255, 0), thickness=3, circle_radius=3),
-                        connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(color=(255, 0, 0), thickness=2)
-                    )
-                else:
-                    # Debug output when no landmarks detected in single-person mode
-                    if self.status_callback:
-                        self.status_callback("⚠️ No landmarks detected (single-person mode)")
-
-            out.write(frame)
-            
-            frame_idx += 1
-            
-            # Update progress if callback provided
-            if progress_callback and total_frames > 0:
-                progress_percent = int((frame_idx / total_frames) * 100)
-                progress_callback(progress_percent)
-
-        cap.release()
-        out.release()
+                    out.write(frame)
+
+                    frame_idx += 1
+
+                    # Update progress if callback provided
+                    if progress_callback and total_frames > 0:
+                        progress_percent = int((frame_idx / total_frames) * 100)
+                        progress_callback(progress_percent)
+        finally:
+            frames_iter.close()
+            source.release()
+            out.release()
         return out_path